@@ -1,29 +1,100 @@
+import sys
+from importlib import import_module
+
 from xagents import a2c, acer, ddpg, dqn, ppo, td3, trpo
-from xagents.a2c.agent import A2C
-from xagents.acer.agent import ACER
-from xagents.base import OffPolicy
-from xagents.ddpg.agent import DDPG
-from xagents.dqn.agent import DQN
-from xagents.ppo.agent import PPO
-from xagents.td3.agent import TD3
-from xagents.trpo.agent import TRPO
 from xagents.utils.cli import play_args, train_args, tune_args
-from xagents.utils.common import register_models
+from xagents.utils.registry import register_models
 
 __author__ = 'schissmantics'
 __email__ = 'schissmantics@outlook.com'
 __license__ = 'MIT'
 __version__ = 1.0
 
+
+class AgentEntry(dict):
+    """
+    xagents.agents entry which imports the agent class on first access
+    to `agent`, therefore only the agents in use are imported.
+    """
+
+    def __init__(self, module, agent_name):
+        """
+        Initialize agent entry.
+        Args:
+            module: Agent package which contains `agent` and `cli` modules.
+            agent_name: Agent class name defined in the agent module.
+        """
+        super(AgentEntry, self).__init__(module=module)
+        self.agent_name = agent_name
+
+    def __missing__(self, key):
+        if key != 'agent':
+            raise KeyError(key)
+        self['agent'] = getattr(
+            import_module(f'{self["module"].__name__}.agent'), self.agent_name
+        )
+        return self['agent']
+
+    def __contains__(self, key):
+        """
+        Check whether key is in entry, `agent` is always considered present.
+        Args:
+            key: Entry key.
+
+        Returns:
+            bool
+        """
+        return key == 'agent' or super(AgentEntry, self).__contains__(key)
+
+    def get(self, key, default=None):
+        """
+        Get entry value, the agent class is imported if `agent` is requested.
+        Args:
+            key: Entry key.
+            default: Value returned if key is not found.
+
+        Returns:
+            Entry value or default.
+        """
+        if key == 'agent':
+            return self['agent']
+        return super(AgentEntry, self).get(key, default)
+
+
 agents = {
-    'a2c': {'module': a2c, 'agent': A2C},
-    'acer': {'module': acer, 'agent': ACER},
-    'dqn': {'module': dqn, 'agent': DQN},
-    'ppo': {'module': ppo, 'agent': PPO},
-    'td3': {'module': td3, 'agent': TD3},
-    'trpo': {'module': trpo, 'agent': TRPO},
-    'ddpg': {'module': ddpg, 'agent': DDPG},
+    'a2c': AgentEntry(a2c, 'A2C'),
+    'acer': AgentEntry(acer, 'ACER'),
+    'dqn': AgentEntry(dqn, 'DQN'),
+    'ppo': AgentEntry(ppo, 'PPO'),
+    'td3': AgentEntry(td3, 'TD3'),
+    'trpo': AgentEntry(trpo, 'TRPO'),
+    'ddpg': AgentEntry(ddpg, 'DDPG'),
 }
+# Agents that use replay buffers and off-policy args, including ACER.
+off_policy_agents = frozenset({'acer', 'ddpg', 'dqn', 'td3'})
+lazy_attributes = {
+    entry.agent_name: f'{entry["module"].__name__}.agent' for entry in agents.values()
+}
+lazy_attributes['OffPolicy'] = 'xagents.base'
+
+
+def __getattr__(name):
+    """
+    Import agent classes and OffPolicy on first access, for example
+    `xagents.A2C` or `from xagents import A2C`
+    Args:
+        name: Attribute name.
+
+    Returns:
+        Requested attribute.
+    """
+    if name not in lazy_attributes:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(lazy_attributes[name]), name)
+    globals()[name] = value
+    return value
+
+
 register_models(agents)
 commands = {
     'train': (train_args, 'fit', 'Train given an agent and environment'),
@@ -38,3 +109,7 @@ commands = {
         'Tune hyperparameters given an agent, hyperparameter specs, and environment',
     ),
 }
+if sys.version_info < (3, 7):
+    # Module __getattr__ is not supported, therefore agent classes are imported.
+    for attribute_name in lazy_attributes:
+        globals()[attribute_name] = __getattr__(attribute_name)
@@ -113,7 +113,7 @@ class A2C(OnPolicy):
             entropies,
             actor_output,
         ) = [[] for _ in range(8)]
-        step_states = tf.numpy_function(self.get_states, [], tf.float32)
+        step_states = tf.numpy_function(self.get_states, [], self.states_dtype)
         step_dones = tf.numpy_function(self.get_dones, [], tf.float32)
         for _ in range(self.n_steps):
             (
@@ -133,7 +133,7 @@ class A2C(OnPolicy):
             *_, step_rewards, step_dones, step_states = tf.numpy_function(
                 self.step_envs,
                 [step_actions, True, False],
-                5 * [tf.float32],
+                [self.states_dtype, *3 * [tf.float32], self.states_dtype],
             )
             rewards.append(step_rewards)
         dones.append(step_dones)
@@ -175,8 +175,8 @@ class A2C(OnPolicy):
         """
         Perform the batching and return calculation in numpy.
         """
+        states, *batch = self.get_batch()
         (
-            states,
             rewards,
             actions,
             critic_output,
@@ -184,7 +184,8 @@ class A2C(OnPolicy):
             log_probs,
             entropies,
             actor_output,
-        ) = [np.asarray(item, np.float32) for item in self.get_batch()]
+        ) = [np.asarray(item, np.float32) for item in batch]
+        states = np.asarray(states, self.states_dtype)
         returns = self.calculate_returns(rewards, dones)
         return self.concat_step_batches(states, returns, actions, critic_output)
 
@@ -198,7 +199,7 @@ class A2C(OnPolicy):
             None
         """
         states, returns, actions, old_values = tf.numpy_function(
-            self.np_train_step, [], 4 * [tf.float32]
+            self.np_train_step, [], [self.states_dtype, *3 * [tf.float32]]
         )
         advantages = returns - old_values
         with tf.GradientTape() as tape:
@@ -1,9 +1,11 @@
+from threading import Event, Thread, current_thread
+
 import numpy as np
 import tensorflow as tf
 from gym.spaces import Discrete
 
-from xagents import A2C
-from xagents.utils.common import LazyFrames
+from xagents.a2c.agent import A2C
+from xagents.utils.buffers import ReplayBuffer3
 
 
 class ACER(A2C):
@@ -32,9 +34,11 @@ class ACER(A2C):
             model: tf.keras.models.Model that is expected to be compiled
                 with an optimizer before training starts.
             buffers: A list of replay buffer objects whose length should match
-                `envs`s'.
-            ema_alpha: Moving average decay passed to tf.train.ExponentialMovingAverage()
-            replay_ratio: Lam value passed to np.random.poisson()
+                `envs`s'. Their sizes are used to create self.replay_buffer
+                which is shared by all environments, and allocated by the
+                first training step.
+            ema_alpha: Moving average decay of the average model weights.
+            replay_ratio: Lam value passed to tf.random.poisson()
             epsilon: epsilon value used in several calculations during gradient update.
             importance_c: Importance weight truncation parameter.
             delta: Delta parameter used for trust region update.
@@ -44,43 +48,83 @@ class ACER(A2C):
         super(ACER, self).__init__(envs, model, **kwargs)
         self.assert_valid_env(envs[0], Discrete)
         self.avg_model = tf.keras.models.clone_model(self.model)
-        self.ema = tf.train.ExponentialMovingAverage(ema_alpha)
+        self.avg_actor = tf.keras.models.Model(
+            self.avg_model.inputs, self.avg_model.outputs[0]
+        )
+        self.ema_alpha = ema_alpha
         self.buffers = buffers
         assert (
             buffers[0].batch_size == 1
         ), f'Buffer batch size should be 1 for ACER, got {buffers[0].batch_size}'
-        self.buffer_current_size = tf.Variable(0)
-        self.batch_indices = tf.range(self.n_steps * self.n_envs, dtype=tf.int64)[
-            :, tf.newaxis
-        ]
         self.replay_ratio = replay_ratio
         self.epsilon = epsilon
         self.importance_c = importance_c
         self.delta = delta
         self.trust_region = trust_region
-        self.batch_dtypes = ['uint8', 'float32', 'int32', 'float32', 'float32']
+        self.batch_dtypes = [
+            self.states_dtype,
+            'float32',
+            'int32',
+            'float32',
+            'float32',
+        ]
         self.batch_shapes = [
             (self.n_envs * (self.n_steps + 1), *self.input_shape),
-            (self.n_envs * self.n_steps),
-            (self.n_envs * self.n_steps),
-            (self.n_envs * self.n_steps),
+            (self.n_envs * self.n_steps,),
+            (self.n_envs * self.n_steps,),
+            (self.n_envs * self.n_steps,),
             (self.n_envs * self.n_steps, self.n_actions),
         ]
+        self.batch_buffers = [
+            [
+                np.zeros(
+                    (self.n_envs, self.n_steps + 1, *self.input_shape),
+                    self.states_dtype,
+                ),
+                np.zeros((self.n_envs, self.n_steps), np.float32),
+                np.zeros((self.n_envs, self.n_steps), np.int32),
+                np.zeros((self.n_envs, self.n_steps), np.float32),
+                np.zeros((self.n_envs, self.n_steps, self.n_actions), np.float32),
+            ]
+            for _ in range(2)
+        ]
+        self.batch_ready = [Event(), Event()]
+        self.batch_free = [Event(), Event()]
+        self.batch_metrics = [[], []]
+        self.batch_index = 0
+        self.collector = None
+        self.collector_index = 0
+        self.collector_error = None
+        self.stop_collection = Event()
+        self.replay_buffer = ReplayBuffer3(
+            buffers[0].size,
+            self.n_envs,
+            [item.shape[1:] for item in self.batch_buffers[0]],
+            self.batch_dtypes,
+            initial_size=buffers[0].initial_size,
+            batch_size=1,
+        )
+        self.update_gradients = tf.function(
+            self.update_gradients,
+            input_signature=[
+                tf.TensorSpec(shape, dtype)
+                for (shape, dtype) in zip(self.batch_shapes, self.batch_dtypes)
+            ],
+            jit_compile=True,
+        )
 
     def flat_to_steps(self, t, steps=None):
         """
-        Split a tensor to tensors of shape (self.n_envs, self.n_steps)
+        Reshape a flat tensor to a step-major tensor.
         Args:
             t: A flat tensor that has (self.n_envs * self.n_steps) values.
             steps: If not specified, self.n_steps is used by default.
 
         Returns:
-            A list of self.n_envs x self.n_steps tensors.
+            A tensor of shape (self.n_steps, self.n_envs, *t.shape[1:])
         """
         t = tf.reshape(t, (self.n_envs, steps or self.n_steps, *t.shape[1:]))
-        return [
-            tf.squeeze(step_t, 1) for step_t in tf.split(t, steps or self.n_steps, 1)
-        ]
+        return tf.transpose(t, (1, 0, *range(2, len(t.shape))))
 
     def clip_last_step(self, t):
         """
@@ -91,83 +135,146 @@ class ACER(A2C):
         Returns:
             Tensor that has self.n_steps items.
         """
-        ts = self.flat_to_steps(t, self.n_steps + 1)
-        return tf.reshape(tf.stack(ts[:-1], 1), (-1, *ts[0].shape[1:]))
+        t = tf.reshape(t, (self.n_envs, self.n_steps + 1, *t.shape[1:]))
+        return tf.reshape(t[:, :-1], (-1, *t.shape[2:]))
 
-    @staticmethod
-    def add_grads(g1, g2):
+    def update_avg_weights(self):
         """
-        Add 2 gradients if neither is None, otherwise return one of them.
-        Args:
-            g1: Grad 1
-            g2: Grad 2
+        Update average model weights after performing gradient update.
+        The average model variables are used directly as moving average
+        shadow variables, therefore no copies are made.
 
         Returns:
-            One of them or their sum.
+            None
         """
-        assert g1 is not None or g2 is not None, 'Gradients are None'
-        if g1 is not None and g2 is not None:
-            return g1 + g2
-        if g1 is not None:
-            return g1
-        return g2
+        for avg_variable, variable in zip(
+            self.avg_model.trainable_variables, self.model.trainable_variables
+        ):
+            avg_variable.assign_sub((1 - self.ema_alpha) * (avg_variable - variable))
 
-    def update_avg_weights(self):
+    def sample_replay(self):
         """
-        Update average model weights after performing gradient update.
+        Sample 1 stored entry per environment from self.replay_buffer.
 
         Returns:
-            None
+            A list of (states, rewards, actions, dones, actor output)
+            tensors of shapes matching self.batch_shapes.
         """
-        avg_variables = [
-            self.ema.average(weight).numpy()
-            for weight in self.model.trainable_variables
+        return [
+            tf.reshape(item, shape)
+            for (item, shape) in zip(self.replay_buffer.get_sample(), self.batch_shapes)
         ]
-        self.avg_model.set_weights(avg_variables)
 
-    def store_batch(self, batch):
+    def fill_batch(self, batch_buffers):
         """
-        Store batch in self.buffers.
+        Collect (states, rewards, actions, dones, actor output) and adjust
+        shapes for gradient update.
+        Environment outputs are written in place to batch_buffers
+        which have (self.n_envs, self.n_steps) as first shape, therefore
+        the flat outputs are views and no copies are made.
         Args:
-            batch: A list of (states, rewards, actions, dones, actor output)
+            batch_buffers: One of the 2 staging buffer lists in self.batch_buffers
+
+        Returns:
+            Merged environment outputs.
+        """
+        states, rewards, actions, dones, actor_output = batch_buffers
+        step_states = self.get_states()
+        for step in range(self.n_steps):
+            (
+                step_actions,
+                *_,
+                step_actor_output,
+            ) = self.get_model_outputs(step_states, self.output_models)
+            step_actions = step_actions.numpy()
+            states[:, step] = step_states
+            actions[:, step] = step_actions
+            actor_output[:, step] = step_actor_output
+            *_, step_rewards, step_dones, step_states = self.step_envs(
+                step_actions, True, False
+            )
+            rewards[:, step] = step_rewards
+            dones[:, step] = step_dones
+        states[:, -1] = self.get_states()
+        return [item.reshape(-1, *item.shape[2:]) for item in batch_buffers]
+
+    def collect_batches(self):
+        """
+        Fill self.batch_buffers alternately in a background thread, each
+        staging buffer is refilled only after the training step that
+        consumed it is complete.
+
+        Returns:
+            None
+        """
+        index = 0
+        try:
+            while True:
+                self.batch_free[index].wait()
+                if self.stop_collection.is_set():
+                    break
+                self.batch_free[index].clear()
+                self.collector_index = index
+                self.fill_batch(self.batch_buffers[index])
+                self.batch_ready[index].set()
+                index ^= 1
+        except Exception as e:
+            self.collector_error = e
+            self.batch_ready[index].set()
+
+    def start_collector(self):
+        """
+        Start collecting environment batches in a background thread
+        while gradient updates are performed on the previous batch.
 
         Returns:
             None
         """
-        for i in range(self.n_envs):
-            env_outputs = []
-            for item in batch:
-                current = item[i]
-                if len(current.shape) > 2:
-                    current = LazyFrames(current.astype(np.uint8))
-                env_outputs.append(current)
-            self.buffers[i].append(*env_outputs)
+        self.batch_index = 0
+        self.collector_error = None
+        self.stop_collection.clear()
+        for ready, free, metrics in zip(
+            self.batch_ready, self.batch_free, self.batch_metrics
+        ):
+            ready.clear()
+            free.set()
+            metrics.clear()
+        self.collector = Thread(target=self.collect_batches, daemon=True)
+        self.collector.start()
+
+    def stop_collector(self):
+        """
+        Stop the background collection thread if running.
+
+        Returns:
+            None
+        """
+        if self.collector is None:
+            return
+        self.stop_collection.set()
+        for free in self.batch_free:
+            free.set()
+        self.collector.join()
+        self.collector = None
 
     def get_batch(self):
         """
-        Get a batch of (states, rewards, actions, dones, actor output),
-        save batch to replay buffers and adjust shapes for gradient update.
+        Get a batch of (states, rewards, actions, dones, actor output)
+        from the background collector if running, otherwise collect
+        it synchronously.
 
         Returns:
             Merged environment outputs.
         """
-        (
-            states,
-            rewards,
-            actions,
-            _,
-            dones,
-            *_,
-            actor_logits,
-        ) = super(ACER, self).get_batch()
-        states.append(self.get_states())
-        batch = [states, rewards, actions, dones[1:], actor_logits]
-        batch = [np.asarray(item).swapaxes(0, 1) for item in batch]
-        self.store_batch(batch)
-        return [
-            item.reshape(-1, *item.shape[2:]).astype(dtype)
-            for (item, dtype) in zip(batch, self.batch_dtypes)
-        ]
+        if self.collector is None:
+            return self.fill_batch(self.batch_buffers[0])
+        index = self.batch_index
+        self.batch_ready[index].wait()
+        self.batch_ready[index].clear()
+        if self.collector_error is not None:
+            raise self.collector_error
+        self.batch_index ^= 1
+        return [item.reshape(-1, *item.shape[2:]) for item in self.batch_buffers[index]]
 
     def calculate_returns(
         self,
@@ -213,7 +320,7 @@ class ACER(A2C):
         action_probs,
         values,
         returns,
-        selected_probs,
+        actions,
         selected_importance,
         selected_critic_logits,
     ):
@@ -223,21 +330,20 @@ class ACER(A2C):
             action_probs: A tensor of shape (self.n_envs * self.n_steps, self.n_actions)
             values: A tensor of shape self.n_envs * (self.n_steps + 1)
             returns: A tensor of shape (self.n_envs * self.n_steps)
-            selected_probs: A tensor of shape (self.n_envs * self.n_steps)
+            actions: A tensor of shape (self.n_envs * self.n_steps)
             selected_importance: A tensor of shape (self.n_envs * self.n_steps)
             selected_critic_logits: A tensor of shape (self.n_envs * self.n_steps)
 
         Returns:
             Loss as a TF tensor if trust region is not used, otherwise loss, value_loss.
         """
+        log_action_probs = tf.math.log(action_probs + self.epsilon)
         entropy = tf.reduce_mean(
-            -tf.reduce_sum(
-                action_probs * tf.math.log(action_probs + self.epsilon), axis=1
-            )
+            -tf.reduce_sum(action_probs * log_action_probs, axis=1)
         )
         values = self.clip_last_step(values)
         advantages = returns - values
-        log_probs = tf.math.log(selected_probs + self.epsilon)
+        log_probs = tf.gather(log_action_probs, actions, batch_dims=1)
         action_gain = log_probs * tf.stop_gradient(
             advantages * tf.minimum(self.importance_c, selected_importance)
         )
@@ -262,7 +368,9 @@ class ACER(A2C):
 
     def calculate_grads(self, tape, losses, action_probs, avg_action_probs):
         """
-        Calculate gradients given loss(es)
+        Calculate gradients given loss(es). If trust region is used, the
+        adjusted policy gradients and the value loss gradients are obtained
+        by a single backward pass through the model.
         Args:
             tape: tf.GradientTape()
             losses: loss or loss, value_loss (if trust region is used)
@@ -287,11 +395,12 @@ class ACER(A2C):
         )
         g = g - tf.reshape(adj, [self.n_envs * self.n_steps, 1]) * k
         output_grads = -g / (self.n_envs * self.n_steps)
-        action_grads = tape.gradient(
-            action_probs, self.model.trainable_variables, output_grads
-        )
-        value_grads = tape.gradient(value_loss, self.model.trainable_variables)
-        return [self.add_grads(g1, g2) for (g1, g2) in zip(action_grads, value_grads)]
+        with tape:
+            combined_loss = (
+                tf.reduce_sum(action_probs * tf.stop_gradient(output_grads))
+                + value_loss
+            )
+        return tape.gradient(combined_loss, self.model.trainable_variables)
 
     def update_gradients(
         self,
@@ -302,9 +411,11 @@ class ACER(A2C):
         previous_action_probs,
     ):
         """
-        Perform gradient updates.
+        Perform gradient updates. This method is wrapped in __init__ by
+        an XLA compiled tf.function that has self.batch_shapes as input signature,
+        therefore on-policy and replay batches share the same compiled graph.
         Args:
-            states: A tensor of shape (self.n_envs * self.n_steps, *self.input_shape)
+            states: A tensor of shape (self.n_envs * (self.n_steps + 1), *self.input_shape)
             rewards: A tensor of shape (self.n_envs * self.n_steps)
             actions: A tensor of shape (self.n_envs * self.n_steps)
             dones: A tensor of shape (self.n_envs * self.n_steps)
@@ -313,22 +424,21 @@ class ACER(A2C):
         Returns:
             None
         """
-        action_indices = tf.concat(
-            (self.batch_indices, tf.cast(actions[:, tf.newaxis], tf.int64)), -1
-        )
         with tf.GradientTape(True) as tape:
             *_, critic_logits, _, action_probs = self.get_model_outputs(
                 states, self.model
             )
-            *_, avg_action_probs = self.get_model_outputs(states, self.avg_model)
+            # Raw average actor output, without A2C sampling from its distribution.
+            avg_action_probs = super(A2C, self).get_model_outputs(
+                states, self.avg_actor
+            )
             values = tf.reduce_sum(action_probs * critic_logits, axis=-1)
             action_probs = self.clip_last_step(action_probs)
             avg_action_probs = self.clip_last_step(avg_action_probs)
             critic_logits = self.clip_last_step(critic_logits)
-            selected_probs = tf.gather_nd(action_probs, action_indices)
-            selected_critic_logits = tf.gather_nd(critic_logits, action_indices)
+            selected_critic_logits = tf.gather(critic_logits, actions, batch_dims=1)
             importance_weights = action_probs / (previous_action_probs + self.epsilon)
-            selected_importance = tf.gather_nd(importance_weights, action_indices)
+            selected_importance = tf.gather(importance_weights, actions, batch_dims=1)
             returns = self.calculate_returns(
                 rewards, dones, values, selected_critic_logits, selected_importance
             )
@@ -336,7 +446,7 @@ class ACER(A2C):
                 action_probs,
                 values,
                 returns,
-                selected_probs,
+                actions,
                 selected_importance,
                 selected_critic_logits,
             )
@@ -344,8 +454,7 @@ class ACER(A2C):
         if self.grad_norm is not None:
             grads, norm_grads = tf.clip_by_global_norm(grads, self.grad_norm)
         self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
-        self.ema.apply(self.model.trainable_variables)
-        tf.numpy_function(self.update_avg_weights, [], [])
+        self.update_avg_weights()
 
     def set_batch_shapes(self, batch):
         """
@@ -361,28 +470,111 @@ class ACER(A2C):
         for item, shape in zip(batch, self.batch_shapes):
             item.set_shape(shape)
 
-    @tf.function
+    @tf.function(input_signature=[])
     def train_step(self):
         """
         Perform 1 step which controls action_selection, interaction with environments
-        in self.envs, batching and gradient updates.
+        in self.envs, batching and gradient updates. Batch shapes are set to
+        self.batch_shapes which match update_gradients input signature, therefore
+        on-policy and replay updates are traced once.
 
         Returns:
             None
         """
         batch = tf.numpy_function(self.get_batch, [], self.batch_dtypes)
-        self.buffer_current_size.assign_add(1)
         self.set_batch_shapes(batch)
+        self.replay_buffer.append(*batch)
         self.update_gradients(*batch)
         if (
             self.replay_ratio > 0
-            and self.buffer_current_size >= self.buffers[0].initial_size
+            and self.replay_buffer.current_size >= self.replay_buffer.initial_size
         ):
-            for _ in range(np.random.poisson(self.replay_ratio)):
-                batch = tf.numpy_function(
-                    self.concat_buffer_samples,
-                    [],
-                    self.batch_dtypes,
-                )
-                self.set_batch_shapes(batch)
-                self.update_gradients(*batch)
+            replay_steps = tf.random.poisson((), self.replay_ratio, tf.int32)
+            for _ in tf.range(replay_steps):
+                self.update_gradients(*self.sample_replay())
+
+    def update_step_metrics(self, done, episode_reward):
+        """
+        Count 1 environment step, and if the episode is finished, update
+        game count, rewards and training history. Steps taken by the
+        background collector are deferred until their batch is consumed,
+        so metrics are only updated by the training thread.
+        Args:
+            done: If True, the episode `episode_reward` belongs to is finished.
+            episode_reward: Episode reward accumulated so far.
+
+        Returns:
+            None
+        """
+        if current_thread() is self.collector:
+            self.batch_metrics[self.collector_index].append((done, episode_reward))
+            return
+        super(ACER, self).update_step_metrics(done, episode_reward)
+
+    def init_training(self, target_reward, max_steps, monitor_session):
+        """
+        Initialize training, and set average model weights to the model
+        weights, which may have been loaded after initialization.
+        Args:
+            target_reward: Total reward per game value that whenever achieved,
+                the training will stop.
+            max_steps: Maximum time steps, if exceeded, the training will stop.
+            monitor_session: Wandb session name.
+
+        Returns:
+            None
+        """
+        super(ACER, self).init_training(target_reward, max_steps, monitor_session)
+        self.avg_model.set_weights(self.model.get_weights())
+
+    def at_step_start(self):
+        """
+        Start the background collector at the first training step, after
+        training is initialized.
+
+        Returns:
+            None
+        """
+        if self.collector is None:
+            self.start_collector()
+
+    def at_step_end(self):
+        """
+        Update metrics of the steps in the batch consumed by the last training
+        step, and release its staging buffer, so the background collector
+        can refill it.
+
+        Returns:
+            None
+        """
+        if self.collector is not None:
+            index = self.batch_index ^ 1
+            for done, episode_reward in self.batch_metrics[index]:
+                self.update_step_metrics(done, episode_reward)
+            self.batch_metrics[index].clear()
+            self.batch_free[index].set()
+
+    def fit(
+        self,
+        target_reward=None,
+        max_steps=None,
+        monitor_session=None,
+    ):
+        """
+        Common training loop shared by subclasses, monitors training status
+        and progress, performs all training steps, updates metrics, and logs progress.
+        ** Additionally, environment batches are collected in a background
+        thread started at the first training step, overlapping environment
+        steps with gradient updates **
+        Args:
+            target_reward: Target reward, if achieved, the training will stop
+            max_steps: Maximum number of steps, if reached the training will stop.
+            monitor_session: Session name to use for monitoring the training with wandb.
+
+        Returns:
+            None
+        """
+        try:
+            super(ACER, self).fit(target_reward, max_steps, monitor_session)
+        finally:
+            self.stop_collector()
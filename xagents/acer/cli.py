@@ -4,13 +4,14 @@ a2c_args = a2c.cli_args
 acer_args = {
     'model': {'help': 'Path to model .cfg file'},
     'ema-alpha': {
-        'help': 'Moving average decay passed to tf.train.ExponentialMovingAverage()',
+        'help': 'Decay of the average model weights, which are moved in place\n'
+        'towards the model weights by (1 - ema-alpha) after each update',
         'type': float,
         'default': 0.99,
         'hp_type': 'log_uniform',
     },
     'replay-ratio': {
-        'help': 'Lam value passed to np.random.poisson()',
+        'help': 'Lam value passed to tf.random.poisson()',
         'type': int,
         'default': 4,
         'hp_type': 'categorical',
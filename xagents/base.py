@@ -16,7 +16,7 @@ import wandb
 from gym.spaces.box import Box
 from gym.spaces.discrete import Discrete
 
-from xagents.utils.common import write_from_dict
+from xagents.utils.common import SharedMemoryEnv, write_from_dict
 
 
 class BaseAgent(ABC):
@@ -118,6 +118,8 @@ class BaseAgent(ABC):
         self.reset_envs()
         self.set_action_count()
         self.img_inputs = len(self.states[0].shape) >= 2
+        self.states_dtype = 'uint8' if self.img_inputs else 'float32'
+        self.async_envs = all(isinstance(env, SharedMemoryEnv) for env in envs)
         self.display_titles = (
             'time',
             'steps',
@@ -384,6 +386,25 @@ class BaseAgent(ABC):
         }
         write_from_dict(data, self.history_checkpoint)
 
+    def update_step_metrics(self, done, episode_reward):
+        """
+        Count 1 environment step, and if the episode is finished, update
+        game count, rewards and training history.
+        Args:
+            done: If True, the episode `episode_reward` belongs to is finished.
+            episode_reward: Episode reward accumulated so far.
+
+        Returns:
+            None
+        """
+        if done:
+            if self.history_checkpoint:
+                self.update_history(episode_reward)
+            self.done_envs += 1
+            self.total_rewards.append(episode_reward)
+            self.games += 1
+        self.steps += 1
+
     def step_envs(self, actions, get_observation=False, store_in_buffers=False):
         """
         Step environments in self.envs, update metrics (if any done games)
@@ -395,16 +416,22 @@ class BaseAgent(ABC):
             store_in_buffers: If True, each observation is saved separately in respective buffer.
 
         Returns:
-            A list of observations as numpy arrays or an empty list.
+            A list of observations as numpy arrays or an empty list. States
+            and new states have self.states_dtype, the rest are float32.
         """
         observations = []
+        if self.async_envs:
+            for env, action in zip(self.envs, actions):
+                env.step_async(action)
         for (
             (i, env),
             action,
             *items,
         ) in zip(enumerate(self.envs), actions):
             state = self.states[i]
-            new_state, reward, done, _ = env.step(action)
+            new_state, reward, done, _ = (
+                env.step_wait() if self.async_envs else env.step(action)
+            )
             self.states[i] = new_state
             self.dones[i] = done
             self.episode_rewards[i] += reward
@@ -413,16 +440,14 @@ class BaseAgent(ABC):
                 self.buffers[i].append(*observation)
             if get_observation:
                 observations.append(observation)
+            self.update_step_metrics(done, self.episode_rewards[i])
             if done:
-                if self.history_checkpoint:
-                    self.update_history(self.episode_rewards[i])
-                self.done_envs += 1
-                self.total_rewards.append(self.episode_rewards[i])
-                self.games += 1
                 self.episode_rewards[i] = 0
                 self.states[i] = env.reset()
-            self.steps += 1
-        return [np.array(item, np.float32) for item in zip(*observations)]
+        dtypes = self.states_dtype, *3 * [np.float32], self.states_dtype
+        return [
+            np.array(item, dtype) for (item, dtype) in zip(zip(*observations), dtypes)
+        ]
 
     def init_from_checkpoint(self):
         """
@@ -502,7 +527,7 @@ class BaseAgent(ABC):
             that is expected from the given model(s).
         """
         if self.img_inputs:
-            inputs = tf.cast(inputs, tf.float32) / 255.0
+            inputs = tf.cast(inputs, tf.float32) * (1 / 255)
         if isinstance(models, tf.keras.models.Model):
             return models(inputs, training=training)
         elif len(models) == 1:
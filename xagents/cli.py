@@ -1,14 +1,11 @@
 import argparse
 import sys
 import warnings
-
-import pandas as pd
+from collections import ChainMap
+from functools import lru_cache
 
 import xagents
-from xagents.base import OffPolicy
 from xagents.utils.cli import agent_args, non_agent_args, off_policy_args
-from xagents.utils.common import create_agent
-from xagents.utils.tuning import run_tuning
 
 
 class Executor:
@@ -24,42 +21,71 @@ class Executor:
         self.command = None
         self.agent = None
 
+    @staticmethod
+    def format_markdown_table(headers, rows):
+        """
+        Format given headers and rows as a markdown table. Multiline cells
+        are displayed over multiple table lines.
+        Args:
+            headers: A list of column names.
+            rows: A list of rows, each is a list of cells having the same
+                size as `headers`.
+
+        Returns:
+            Markdown table as str.
+        """
+        split_rows = [
+            [str(cell).split('\n') for cell in row] for row in [headers, *rows]
+        ]
+        widths = [
+            max(len(line) for row in split_rows for line in row[i])
+            for i in range(len(headers))
+        ]
+        lines = []
+        for i, row in enumerate(split_rows):
+            for j in range(max(len(cell) for cell in row)):
+                cells = [
+                    (cell[j] if j < len(cell) else '').ljust(width)
+                    for (cell, width) in zip(row, widths)
+                ]
+                lines.append(f'| {" | ".join(cells)} |')
+            if i == 0:
+                lines.append(
+                    f'|{"|".join(":" + "-" * (width + 1) for width in widths)}|'
+                )
+        return '\n'.join(lines)
+
     @staticmethod
     def display_section(title, cli_args):
         """
         Display given title (command) and respective available options.
         Args:
             title: Command(s) that will be displayed on top of cli options.
-            cli_args: A dictionary having flags and their respective
+            cli_args: A mapping having flags and their respective
                 `help`, `required` and `default`
 
         Returns:
             None
         """
-        section_frame = pd.DataFrame(cli_args).T.fillna('-')
-        section_frame['flags'] = section_frame.index.values
-        section_frame['flags'] = section_frame['flags'].apply(lambda flag: f'--{flag}')
-        section_frame = (
-            section_frame.reset_index(drop=True).set_index('flags').sort_index()
-        )
+        items = sorted(cli_args.items())
+        columns = [
+            column_name
+            for column_name in ('help', 'default', 'hp_type')
+            if any(column_name in options for _, options in items)
+        ]
+        rows = []
+        for flag, options in items:
+            values = [options.get(column_name) for column_name in columns]
+            rows.append(
+                [f'--{flag}', *['-' if value is None else value for value in values]]
+            )
         print(f'\n{title}\n')
-        print(
-            section_frame[
-                [
-                    column_name
-                    for column_name in ('help', 'default', 'hp_type')
-                    if column_name in section_frame.columns
-                ]
-            ].to_markdown()
-        )
+        print(Executor.format_markdown_table(['flags', *columns], rows))
 
-    def display_commands(self, sections=None):
+    @staticmethod
+    def display_base():
         """
-        Display available commands and their description
-            + command specific sections if given any.
-        Args:
-            sections: A dictionary having flags and their respective
-                `help`, `required` and `default`
+        Display usage and available commands with their description.
 
         Returns:
             None
@@ -73,47 +99,69 @@ class Executor:
         print()
         print('Use xagents <command> to see more info about a command')
         print('Use xagents <command> <agent> to see more info about command + agent')
+
+    def display_commands(self, sections=None):
+        """
+        Display available commands and their description
+            + command specific sections if given any.
+        Args:
+            sections: A dictionary having flags and their respective
+                `help`, `required` and `default`
+
+        Returns:
+            None
+        """
+        self.display_base()
         if sections:
             for title, cli_args in sections.items():
                 self.display_section(title, cli_args)
 
+    @staticmethod
+    def get_argument_kwargs(cli_args, tuning=False):
+        """
+        Get parser.add_argument() kwargs for given arguments, with
+        unspecified options excluded except for `default`, which is
+        None for unspecified `store_true` flags.
+        Args:
+            cli_args: A dictionary of args and options.
+            tuning: If True, flags that have an `hp_type`
+                will support multiple parameters which will
+                be parsed according to their type.
+
+        Returns:
+            A list of (flag, kwargs) pairs.
+        """
+        argument_kwargs = []
+        for arg, options in cli_args.items():
+            action = options.get('action')
+            keys = (
+                ('help', 'action') if action else ('help', 'type', 'required', 'nargs')
+            )
+            kwargs = {key: options[key] for key in keys if options.get(key) is not None}
+            kwargs['default'] = options.get('default')
+            if tuning and options.get('hp_type') and not action:
+                kwargs['nargs'] = '*'
+            argument_kwargs.append((f'--{arg}', kwargs))
+        return argument_kwargs
+
     @staticmethod
     def add_args(cli_args, parser, tuning=False):
         """
         Add given arguments to parser.
         Args:
             cli_args: A dictionary of args and options.
-            parser: argparse.ArgumentParser
+            parser: argparse.ArgumentParser or argument group.
             tuning: If True, flags that have an `hp_type`
                 will support multiple parameters which will
                 be parsed according to their type.
 
         Returns:
-            None.
+            A list of the added argparse.Action(s).
         """
-        for arg, options in cli_args.items():
-            _help = options.get('help')
-            _default = options.get('default')
-            _type = options.get('type')
-            _action = options.get('action')
-            _required = options.get('required')
-            _nargs = options.get('nargs')
-            _hp_type = options.get('hp_type')
-            if not _action:
-                if tuning and _hp_type:
-                    _nargs = '*'
-                parser.add_argument(
-                    f'--{arg}',
-                    help=_help,
-                    default=_default,
-                    type=_type,
-                    required=_required,
-                    nargs=_nargs,
-                )
-            else:
-                parser.add_argument(
-                    f'--{arg}', help=_help, default=_default, action=_action
-                )
+        return [
+            parser.add_argument(flag, **kwargs)
+            for flag, kwargs in Executor.get_argument_kwargs(cli_args, tuning)
+        ]
 
     def maybe_create_agent(self, argv):
         """
@@ -125,32 +173,69 @@ class Executor:
         Returns:
             None
         """
-        to_display = {}
         total = len(argv)
         if total == 0:
-            self.display_commands()
+            self.display_base()
             return
         command = argv[0]
-        to_display.update(non_agent_args)
-        to_display.update(agent_args)
         assert command in xagents.commands, f'Invalid command `{command}`'
-        to_display.update(xagents.commands[command][0])
-        if total == 1:
-            self.display_commands({command: to_display})
+        agent_id = argv[1] if total > 1 else None
+        assert (
+            agent_id is None or agent_id in xagents.agents
+        ), f'Invalid agent `{agent_id}`'
+        if total > 2:
+            self.command, self.agent_id = command, agent_id
             return
-        agent_id = argv[1]
-        assert agent_id in xagents.agents, f'Invalid agent `{agent_id}`'
-        to_display.update(xagents.agents[agent_id]['module'].cli_args)
-        if total == 2:
+        title = command
+        to_display = ChainMap(xagents.commands[command][0], agent_args, non_agent_args)
+        if agent_id:
             title = f'{command} {agent_id}'
-            if (
-                issubclass(xagents.agents[agent_id]['agent'], OffPolicy)
-                or agent_id == 'acer'
-            ):
-                to_display.update(off_policy_args)
-            self.display_commands({title: to_display})
-            return
-        self.command, self.agent_id = command, agent_id
+            agent_entry = xagents.agents[agent_id]
+            to_display = to_display.new_child(agent_entry['module'].cli_args)
+            if agent_id in xagents.off_policy_agents:
+                to_display = to_display.new_child(off_policy_args)
+        self.display_commands({title: to_display})
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def build_parser(command, agent_id, tuning=False):
+        """
+        Create a parser having general, agent and command specific argument
+        groups. Parsers are cached, given they are not modified by parsing.
+        Args:
+            command: Command name, one of xagents.commands.
+            agent_id: Agent id, one of xagents.agents.
+            tuning: If True, flags that have an `hp_type`
+                will support multiple parameters which will
+                be parsed according to their type.
+
+        Returns:
+            parser, and general, agent and command destinations.
+        """
+        parser = argparse.ArgumentParser()
+        general_group = parser.add_argument_group('general')
+        agent_group = parser.add_argument_group('agent')
+        command_group = parser.add_argument_group('command')
+        agent_actions = [
+            *Executor.add_args(agent_args, agent_group, tuning),
+            *Executor.add_args(
+                xagents.agents[agent_id]['module'].cli_args, agent_group, tuning
+            ),
+        ]
+        command_actions = Executor.add_args(
+            xagents.commands[command][0], command_group, tuning
+        )
+        general_actions = []
+        if agent_id in xagents.off_policy_agents:
+            general_actions.extend(
+                Executor.add_args(off_policy_args, general_group, tuning)
+            )
+        general_actions.extend(Executor.add_args(non_agent_args, general_group, tuning))
+        general_dests, agent_dests, command_dests = [
+            [action.dest for action in actions]
+            for actions in (general_actions, agent_actions, command_actions)
+        ]
+        return parser, general_dests, agent_dests, command_dests
 
     def parse_known_args(self, argv, tuning=False):
         """
@@ -163,27 +248,18 @@ class Executor:
         Returns:
             agent kwargs, non-agent kwargs and command kwargs.
         """
-        general_parser = argparse.ArgumentParser()
-        agent_parser = argparse.ArgumentParser()
-        command_parser = argparse.ArgumentParser()
-        self.add_args(agent_args, agent_parser, tuning)
-        self.add_args(
-            xagents.agents[self.agent_id]['module'].cli_args, agent_parser, tuning
+        parser, general_dests, agent_dests, command_dests = self.build_parser(
+            self.command, self.agent_id, tuning
         )
-        self.add_args(xagents.commands[self.command][0], command_parser, tuning)
-        if (
-            issubclass(xagents.agents[self.agent_id]['agent'], OffPolicy)
-            or self.agent_id == 'acer'
-        ):
-            self.add_args(off_policy_args, general_parser, tuning)
-        self.add_args(non_agent_args, general_parser, tuning)
-        non_agent_known, extra1 = general_parser.parse_known_args(argv)
-        agent_known, extra2 = agent_parser.parse_known_args(argv)
-        command_known, extra3 = command_parser.parse_known_args(argv)
+        known, extra = parser.parse_known_args(argv)
+        non_agent_known, agent_known, command_known = [
+            argparse.Namespace(**{dest: getattr(known, dest) for dest in dests})
+            for dests in (general_dests, agent_dests, command_dests)
+        ]
         unknown_flags = [
             unknown_flag
-            for unknown_flag in set(extra1) & set(extra2) & set(extra3)
-            if unknown_flag not in [self.command, self.agent_id]
+            for unknown_flag in dict.fromkeys(extra)
+            if unknown_flag not in (self.command, self.agent_id)
             and '--' in unknown_flag
         ]
         if unknown_flags:
@@ -208,20 +284,23 @@ class Executor:
         if not self.agent_id:
             return
         if self.command == 'tune':
+            from xagents.utils.tuning import run_tuning
+
             agent_known, non_agent_known, command_known = self.parse_known_args(
                 argv, True
             )
             run_tuning(self.agent_id, agent_known, non_agent_known, command_known)
         else:
+            from xagents.utils.common import create_agent
+
             agent_known, non_agent_known, command_known = self.parse_known_args(
                 argv,
             )
             self.agent = create_agent(
                 self.agent_id, vars(agent_known), vars(non_agent_known)
             )
-            getattr(self.agent, xagents.commands[self.command][1])(
-                **vars(command_known)
-            )
+            command_method = xagents.commands[self.command][1]
+            getattr(self.agent, command_method)(**vars(command_known))
 
 
 def execute(argv=None):
@@ -1,7 +1,7 @@
 import numpy as np
 import tensorflow as tf
 
-from xagents import A2C
+from xagents.a2c.agent import A2C
 
 
 class PPO(A2C):
@@ -45,6 +45,20 @@ class PPO(A2C):
         assert (
             self.mini_batch_size > 0
         ), f'Invalid batch size to mini-batch size ratio {self.batch_size}: {self.mini_batches}'
+        self.update_gradients = tf.function(
+            self.update_gradients,
+            input_signature=[
+                tf.TensorSpec(
+                    (self.mini_batch_size, *self.input_shape), self.states_dtype
+                ),
+                tf.TensorSpec(
+                    (self.mini_batch_size, *self.envs[0].action_space.shape),
+                    tf.float32,
+                ),
+                *3 * [tf.TensorSpec((self.mini_batch_size,), tf.float32)],
+            ],
+            jit_compile=True,
+        )
 
     def calculate_returns(
         self,
@@ -55,10 +69,10 @@ class PPO(A2C):
         selected_importance=None,
     ):
         """
-        Get a batch of returns.
+        Get a batch of GAE-Lambda returns, calculated in reverse using tf.scan()
         Args:
             rewards: Rewards tensor of shape (self.n_steps, self.n_envs)
-            dones: Dones tensor of shape (self.n_steps, self.n_envs)
+            dones: Dones tensor of shape (self.n_steps + 1, self.n_envs)
             values: Values tensor of shape (self.n_steps + 1, self.n_envs).
                 required for PPO, TRPO and ACER
             selected_critic_logits: Critic output respective to selected actions
@@ -68,48 +82,37 @@ class PPO(A2C):
                 actions of shape (self.n_steps, self.n_envs).
                 Required for ACER
         Returns:
-            Tensor of n-step returns.
-        """
-        next_values = self.get_model_outputs(self.get_states(), self.output_models)[
-            2
-        ].numpy()
-        next_values = (
-            np.expand_dims(next_values, 0)
-            if not len(next_values.shape)
-            else next_values
+            Tensor of returns of shape (self.n_steps, self.n_envs)
+        """
+        next_non_terminal = 1.0 - dones[1:]
+        deltas = rewards + self.gamma * values[1:] * next_non_terminal - values[:-1]
+        advantages = tf.scan(
+            lambda last_lam, step: step[0] + self.gamma * self.lam * step[1] * last_lam,
+            (deltas, next_non_terminal),
+            tf.zeros_like(deltas[0]),
+            reverse=True,
         )
-        returns = []
-        last_lam = 0
-        values = np.concatenate([values, np.expand_dims(next_values, 0)])
-        dones = np.concatenate([dones, np.expand_dims(dones[-1], 0)])
-        for step in reversed(range(self.n_steps)):
-            next_non_terminal = 1 - dones[step + 1]
-            next_values = values[step + 1]
-            delta = (
-                rewards[step]
-                + self.gamma * next_values * next_non_terminal
-                - values[step]
-            )
-            last_lam = delta + self.gamma * self.lam * next_non_terminal * last_lam
-            returns.append(last_lam)
-        return np.asarray(returns[::-1]) + values[:-1]
+        return advantages + values[:-1]
 
-    def update_gradients(
-        self, states, actions, old_values, returns, old_log_probs, advantages
-    ):
+    def update_gradients(self, states, actions, old_values, returns, old_log_probs):
         """
-        Perform gradient updates.
+        Calculate normalized advantages and perform gradient updates.
+        This method is wrapped in __init__ by an XLA compiled tf.function
+        that has a fixed mini-batch input signature.
         Args:
             states: states as numpy array of shape (self.mini_batch_size, *self.input_shape)
             actions: actions as numpy array of shape (self.mini_batch_size,)
             old_values: old values as numpy array of shape (self.mini_batch_size,)
             returns: returns as numpy array of shape (self.mini_batch_size,)
             old_log_probs: old log probs as numpy array of shape (self.mini_batch_size,)
-            advantages: advantages as numpy array of shape (self.mini_batch_size,)
 
         Returns:
             None
         """
+        advantages = returns - old_values
+        advantages = (advantages - tf.reduce_mean(advantages)) / (
+            tf.math.reduce_std(advantages) + self.advantage_epsilon
+        )
         with tf.GradientTape() as tape:
             _, log_probs, values, entropy, _ = self.get_model_outputs(
                 states, self.output_models, actions=actions
@@ -157,7 +160,11 @@ class PPO(A2C):
 
     def run_ppo_epochs(self, states, actions, returns, old_values, old_log_probs):
         """
-        Split batch into mini batches and perform gradient updates.
+        Split batch into mini batches and perform gradient updates. Mini-batch
+        indices are shuffled every epoch and prefetched by a tf.data pipeline,
+        while the batch itself stays on device and is gathered per mini-batch.
+        Incomplete mini-batches are dropped, therefore only 1 gradient update
+        is traced regardless of self.ppo_epochs and self.mini_batches.
         Args:
             states: states as numpy array of shape (self.n_steps * self.n_envs, *self.input_shape)
             actions: actions as numpy array of shape (self.n_steps * self.n_envs,)
@@ -168,50 +175,98 @@ class PPO(A2C):
         Returns:
             None
         """
-        for mini_batch in self.get_mini_batches(
-            states, actions, returns, old_values, old_log_probs
-        ):
+        mini_batch_indices = (
+            tf.data.Dataset.range(self.batch_size)
+            .shuffle(self.batch_size, reshuffle_each_iteration=True)
+            .batch(self.mini_batch_size, drop_remainder=True)
+            .repeat(self.ppo_epochs)
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        for batch_indices in mini_batch_indices:
             (
                 states_mb,
                 actions_mb,
                 returns_mb,
                 old_values_mb,
                 old_log_probs_mb,
-            ) = mini_batch
-            advantages_mb = returns_mb - old_values_mb
-            advantages_mb = (advantages_mb - tf.reduce_mean(advantages_mb)) / (
-                tf.math.reduce_std(advantages_mb) + self.advantage_epsilon
-            )
+            ) = [
+                tf.gather(item, batch_indices)
+                for item in (states, actions, returns, old_values, old_log_probs)
+            ]
             self.update_gradients(
                 states_mb,
                 actions_mb,
                 old_values_mb,
                 returns_mb,
                 old_log_probs_mb,
-                advantages_mb,
             )
 
     def get_batch(self):
         """
         Get n-step batch which is the result of running self.envs step() for
-        self.n_steps times, calculate returns and adjust n-step batch shapes
-        for gradient updates.
+        self.n_steps times.
 
         Returns:
-            [states, actions, returns, values, log probs] with adjusted shapes.
+            [states, rewards, actions, values, dones, log probs, last states]
+            as numpy arrays that have (self.n_steps, self.n_envs) as first shape,
+            except for dones which have self.n_steps + 1 steps, and last states.
         """
+        states, *batch = super(PPO, self).get_batch()
         (
-            states,
             rewards,
             actions,
             values,
             dones,
             log_probs,
             *_,
-        ) = [np.asarray(item, np.float32) for item in super(PPO, self).get_batch()]
-        values = np.expand_dims(values, -1) if len(values.shape) <= 1 else values
+        ) = [np.asarray(item, np.float32) for item in batch]
+        states = np.asarray(states, self.states_dtype)
+        last_states = np.asarray(self.get_states(), self.states_dtype)
+        return states, rewards, actions, values, dones, log_probs, last_states
+
+    def get_training_batch(self):
+        """
+        Get n-step batch, calculate returns using the critic output of the
+        last states, and flatten steps for gradient updates. Only environment
+        steps run outside the graph.
+
+        Returns:
+            [states, actions, returns, values, log probs] having
+            self.n_steps * self.n_envs as first shape.
+        """
+        action_shape = self.envs[0].action_space.shape
+        (
+            states,
+            rewards,
+            actions,
+            values,
+            dones,
+            log_probs,
+            last_states,
+        ) = tf.numpy_function(
+            self.get_batch,
+            [],
+            [self.states_dtype, *5 * [tf.float32], self.states_dtype],
+        )
+        last_states.set_shape((self.n_envs, *self.input_shape))
+        next_values = self.get_model_outputs(last_states, self.output_models)[2]
+        values = tf.concat(
+            [
+                tf.reshape(values, (self.n_steps, self.n_envs)),
+                tf.reshape(next_values, (1, self.n_envs)),
+            ],
+            0,
+        )
+        dones = tf.reshape(dones, (self.n_steps + 1, self.n_envs))
+        rewards = tf.reshape(rewards, (self.n_steps, self.n_envs))
         returns = self.calculate_returns(rewards, dones, values)
-        return self.concat_step_batches(states, actions, returns, values, log_probs)
+        return [
+            tf.reshape(item, (self.batch_size, *shape))
+            for (item, shape) in zip(
+                (states, actions, returns, values[:-1], log_probs),
+                (self.input_shape, action_shape, (), (), ()),
+            )
+        ]
 
     @tf.function
     def train_step(self):
@@ -222,5 +277,4 @@ class PPO(A2C):
         Returns:
             None
         """
-        batch = tf.numpy_function(self.get_batch, [], 5 * [tf.float32])
-        self.run_ppo_epochs(*batch)
+        self.run_ppo_epochs(*self.get_training_batch())
@@ -1,7 +1,7 @@
 import tensorflow as tf
 from tensorflow.keras.losses import MSE
 
-from xagents import DDPG
+from xagents.ddpg.agent import DDPG
 
 
 class TD3(DDPG):
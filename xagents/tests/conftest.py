@@ -9,17 +9,18 @@ import xagents
 from xagents import ACER, DDPG, DQN, TD3
 from xagents.base import BaseAgent, OffPolicy, OnPolicy
 from xagents.cli import Executor
-from xagents.utils.buffers import ReplayBuffer1, ReplayBuffer2
+from xagents.utils.buffers import ReplayBuffer1, ReplayBuffer2, ReplayBuffer3
 from xagents.utils.cli import (agent_args, non_agent_args, play_args,
                                train_args, tune_args)
 
 optuna.logging.set_verbosity(optuna.logging.ERROR)
 
 
-@pytest.fixture(scope='function')
+@pytest.fixture(scope='class')
 def executor(request):
     """
-    Fixture for testing command line options.
+    Fixture for testing command line options, shared by the tests
+    of a class.
     Args:
         request: _pytest.fixtures.SubRequest
 
@@ -29,6 +30,23 @@ def executor(request):
     request.cls.executor = Executor()
 
 
+@pytest.fixture(scope='function')
+def reset_executor(request, executor):
+    """
+    Fixture that resets the state of the shared executor after each test.
+    Args:
+        request: _pytest.fixtures.SubRequest
+        executor: Fixture that sets `request.cls.executor`.
+
+    Yields:
+        None
+    """
+    yield
+    request.cls.executor.agent_id = None
+    request.cls.executor.command = None
+    request.cls.executor.agent = None
+
+
 @pytest.fixture(
     params=[
         ('non-agent', non_agent_args),
@@ -51,32 +69,56 @@ def section(request):
     yield request.param
 
 
+@pytest.fixture(scope='session')
+def pong_envs():
+    """
+    Fixture of PongNoFrameskip-v4 environments created once per test session.
+
+    Returns:
+        A list of 4 pong environments.
+    """
+    return [gym.make('PongNoFrameskip-v4') for _ in range(4)]
+
+
+@pytest.fixture(scope='session')
+def bipedal_walker_envs():
+    """
+    Fixture of BipedalWalker-v3 environments created once per test session.
+
+    Returns:
+        A list of 4 bipedal walker environments.
+    """
+    return [gym.make('BipedalWalker-v3') for _ in range(4)]
+
+
 @pytest.fixture(scope='class')
-def envs(request):
+def envs(request, pong_envs):
     """
     Fixture of PongNoFrameskip-v4 environments used to test agents that support
     environments with Discrete action space.
     Args:
         request: _pytest.fixtures.SubRequest
+        pong_envs: Fixture of session pong environments.
 
     Returns:
         A list of 4 pong environments.
     """
-    request.cls.envs = [gym.make('PongNoFrameskip-v4') for _ in range(4)]
+    request.cls.envs = pong_envs
 
 
 @pytest.fixture(scope='class')
-def envs2(request):
+def envs2(request, bipedal_walker_envs):
     """
     Fixture of BipedalWalker-v3 environments used to test agents that support
     environments with continuous action space.
     Args:
         request: _pytest.fixtures.SubRequest
+        bipedal_walker_envs: Fixture of session bipedal walker environments.
 
     Returns:
         A list of 4 bipedal walker environments.
     """
-    request.cls.envs2 = [gym.make('BipedalWalker-v3') for _ in range(4)]
+    request.cls.envs2 = bipedal_walker_envs
 
 
 @pytest.fixture(scope='class')
@@ -142,6 +184,21 @@ def buffer2(request):
     request.cls.buffer = ReplayBuffer2(100, 5, batch_size=4)
 
 
+@pytest.fixture(scope='function')
+def buffer3(request):
+    """
+    Fixture used to test ReplayBuffer3.
+    Args:
+        request: _pytest.fixtures.SubRequest
+
+    Returns:
+        None
+    """
+    request.cls.buffer = ReplayBuffer3(
+        4, 2, [(84, 84, 1), (), ()], ['uint8', 'int32', 'float32'], batch_size=1
+    )
+
+
 @pytest.fixture(params=[item['agent'] for item in xagents.agents.values()])
 def agent(request):
     """
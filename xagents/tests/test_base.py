@@ -106,7 +106,6 @@ class TestBase:
         """
         valid_envs = self.envs if agent not in [TD3, DDPG] else self.envs2
         agent_kwargs = {'envs': envs if envs is not None else valid_envs}
-        buffers = buffers or self.buffers
         if self.model_counts[agent] > 1:
             agent_kwargs['actor_model'] = model or tf.keras.models.clone_model(
                 self.model
@@ -119,11 +118,11 @@ class TestBase:
         else:
             agent_kwargs['model'] = model or self.model
         if agent == xagents.ACER:
-            for buffer in buffers:
-                buffer.batch_size = 1
-            agent_kwargs['buffers'] = buffers
+            agent_kwargs['buffers'] = buffers or [
+                ReplayBuffer1(10, batch_size=1) for _ in agent_kwargs['envs']
+            ]
         if issubclass(agent, OffPolicy) or agent == OffPolicy:
-            agent_kwargs['buffers'] = buffers
+            agent_kwargs['buffers'] = buffers or self.buffers
         return agent_kwargs
 
     def test_no_envs(self, agent):
@@ -717,6 +716,103 @@ class TestBase:
             'Maximum steps exceeded',
         ]
 
+    @staticmethod
+    def calculate_gae_returns(rewards, dones, values, gamma, lam):
+        """
+        Calculate GAE-Lambda returns step by step, as a reference for
+        PPO.calculate_returns()
+        Args:
+            rewards: numpy array of shape (n_steps, n_envs)
+            dones: numpy array of shape (n_steps + 1, n_envs)
+            values: numpy array of shape (n_steps + 1, n_envs)
+            gamma: Discount factor.
+            lam: GAE-Lambda.
+
+        Returns:
+            numpy array of shape (n_steps, n_envs)
+        """
+        returns = []
+        last_lam = 0
+        for step in reversed(range(rewards.shape[0])):
+            next_non_terminal = 1 - dones[step + 1]
+            delta = (
+                rewards[step]
+                + gamma * values[step + 1] * next_non_terminal
+                - values[step]
+            )
+            last_lam = delta + gamma * lam * next_non_terminal * last_lam
+            returns.append(last_lam)
+        return np.asarray(returns[::-1]) + values[:-1]
+
+    @pytest.mark.parametrize('n_envs', [1, 3])
+    def test_ppo_calculate_returns(self, n_envs):
+        """
+        Ensure PPO returns calculated in reverse using tf.scan() match
+        returns calculated step by step.
+        Args:
+            n_envs: Number of environments.
+        """
+        agent = PPO(**self.get_agent_kwargs(PPO, self.envs[:n_envs]))
+        agent.gamma = agent.lam = 0.5
+        rewards = np.array([[1, 0, 2]] * n_envs, np.float32).T
+        dones = np.array([[0, 0, 1, 0]] * n_envs, np.float32).T
+        values = np.array([[0.5, 1, 1.5, 2]] * n_envs, np.float32).T
+        returns = agent.calculate_returns(rewards, dones, values).numpy()
+        assert np.allclose(returns, np.array([[1.25, 0, 3]] * n_envs).T)
+        rewards[:, -1] = [3, -1, 0.5]
+        dones[1:, -1] = [1, 0, 0]
+        values[:, -1] = [2, -1, 0.5, 1]
+        agent.gamma, agent.lam = 0.99, 0.95
+        returns = agent.calculate_returns(rewards, dones, values).numpy()
+        expected = self.calculate_gae_returns(rewards, dones, values, 0.99, 0.95)
+        assert np.allclose(returns, expected)
+
+    def test_fit_acer_collector(self, tmp_path):
+        """
+        Train ACER with the background collector and a history checkpoint,
+        and ensure finished episodes are recorded by the training thread,
+        max steps are not exceeded by more than 1 batch, and the collector
+        is stopped.
+        Args:
+            tmp_path: pathlib.PosixPath
+        """
+        history_checkpoint = tmp_path / 'acer_history.parquet'
+        envs = [gym.make('CartPole-v1') for _ in range(2)]
+        n_steps = 5
+        max_steps = 500
+        agent = ACER(
+            envs,
+            buffers=create_buffers('acer', 20, 1, len(envs)),
+            n_steps=n_steps,
+            history_checkpoint=history_checkpoint.as_posix(),
+            quiet=True,
+            **create_models(xagents.agents['acer'], envs[0], 'acer'),
+        )
+        agent.fit(max_steps=max_steps)
+        assert agent.collector is None
+        assert max_steps <= agent.steps < max_steps + len(envs) * n_steps
+        assert agent.games
+        assert pd.read_parquet(history_checkpoint).shape[0] == agent.games
+
+    def test_init_training_acer_avg_model(self):
+        """
+        Ensure ACER average model starts from the model weights set
+        after initialization, for example by loading --weights.
+        """
+        envs = [gym.make('CartPole-v1') for _ in range(2)]
+        agent = ACER(
+            envs,
+            buffers=create_buffers('acer', 20, 1, len(envs)),
+            **create_models(xagents.agents['acer'], envs[0], 'acer'),
+        )
+        loaded_weights = [
+            np.random.random(weight.shape) for weight in agent.model.get_weights()
+        ]
+        agent.model.set_weights(loaded_weights)
+        agent.init_training(None, 1, None)
+        for avg_weight, weight in zip(agent.avg_model.get_weights(), loaded_weights):
+            assert np.allclose(avg_weight, weight)
+
     @pytest.mark.parametrize('supported_agent', [DQN, TD3, DDPG])
     def test_fill_buffers(self, supported_agent, capsys):
         """
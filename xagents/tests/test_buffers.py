@@ -157,3 +157,42 @@ class TestBuffer2:
         for observation in self.observations:
             self.buffer.append(*observation)
             assert_sample_shapes_match(self.buffer, shapes)
+
+
+@pytest.mark.usefixtures('buffer3')
+class TestBuffer3:
+    """
+    Test ReplayBuffer3 methods.
+    """
+
+    def test_append(self):
+        """
+        Ensure entries are stored per environment, and the oldest
+        entries are overwritten once the buffer is full.
+        """
+        entries = [
+            [
+                np.random.randint(0, 255, (2, 84, 84, 1)),
+                np.random.randint(0, 6, 2),
+                np.random.random(2),
+            ]
+            for _ in range(6)
+        ]
+        assert not self.buffer.slots
+        for entry in entries:
+            self.buffer.append(*entry)
+        assert self.buffer.current_size.numpy() == self.buffer.size
+        for position, entry in zip([2, 3, 0, 1], entries[2:]):
+            for slot, item in zip(self.buffer.slots, entry):
+                assert np.allclose(slot[:, position].numpy(), item)
+
+    def test_get_sample(self):
+        """
+        Test sample shapes, and ensure samples are drawn from stored entries.
+        """
+        entry = [np.ones((2, 84, 84, 1)), np.ones(2), np.ones(2)]
+        self.buffer.append(*entry)
+        sample = self.buffer.get_sample()
+        for shape, item in zip(self.buffer.shapes, sample):
+            assert item.shape == (self.buffer.n_envs, *shape)
+            assert (item.numpy() == 1).all()
@@ -11,7 +11,7 @@ from xagents.tests.utils import assert_flags_displayed, get_expected_flags
 from xagents.utils.common import create_model
 
 
-@pytest.mark.usefixtures('executor', 'envs', 'envs2')
+@pytest.mark.usefixtures('executor', 'reset_executor', 'envs', 'envs2')
 class TestExecutor:
     """
     Tests for command line options.
@@ -28,6 +28,22 @@ class TestExecutor:
         cap = capsys.readouterr().out
         assert_flags_displayed(cap, *section)
 
+    def test_format_markdown_table(self):
+        """
+        Ensure table columns are aligned, and multiline cells are
+        displayed over multiple lines.
+        """
+        table = self.executor.format_markdown_table(
+            ['flags', 'help'], [['--flag1', 'line1\nline2'], ['--flag2', 'help2']]
+        ).split('\n')
+        assert table == [
+            '| flags   | help  |',
+            '|:--------|:------|',
+            '| --flag1 | line1 |',
+            '|         | line2 |',
+            '| --flag2 | help2 |',
+        ]
+
     @staticmethod
     def assert_base_displayed(cap):
         """
@@ -207,6 +223,43 @@ class TestExecutor:
         actual = {**vars(agent_args), **vars(non_agent_args), **vars(command_args)}
         assert set(get_expected_flags(argv, True)) == set(actual.keys())
 
+    def test_agent_entry(self, agent_id):
+        """
+        Ensure lazily imported agent classes are found by `in` and get().
+        Args:
+            agent_id: One of the agent ids available in xagents.agents
+        """
+        entry = xagents.agents[agent_id]
+        assert 'agent' in entry
+        agent = getattr(xagents, entry.agent_name)
+        assert entry.get('agent') is entry['agent'] is agent
+        assert entry.get('unknown-key') is None
+
+    def test_off_policy_agents(self, agent_id):
+        """
+        Ensure precomputed off-policy agent ids match agent classes.
+        Args:
+            agent_id: One of the agent ids available in xagents.agents
+        """
+        agent = xagents.agents[agent_id]['agent']
+        assert (agent_id in xagents.off_policy_agents) == (
+            issubclass(agent, xagents.OffPolicy) or agent_id == 'acer'
+        )
+
+    def test_build_parser(self, command, agent_id):
+        """
+        Ensure parsers are built once per command, agent and tuning.
+        Args:
+            command: One of the commands available in xagents.commands
+            agent_id: One of the agent ids available in xagents.agents
+        """
+        parser, *dests = self.executor.build_parser(command, agent_id, False)
+        assert self.executor.build_parser(command, agent_id, False)[0] is parser
+        assert self.executor.build_parser(command, agent_id, True)[0] is not parser
+        assert set(get_expected_flags([command, agent_id], True)) == {
+            dest for group_dests in dests for dest in group_dests
+        }
+
     def test_create_models(self, agent_id):
         """
         Test creation of models and ensure resulting output units match the expected.
@@ -1,12 +1,15 @@
+import gc
 import os
 import random
 import uuid
 from pathlib import Path
 
 import gym
+import numpy as np
 import pytest
 
-from xagents.utils.common import AtariWrapper, create_buffers, get_wandb_key
+from xagents.utils.common import (AtariWrapper, SharedMemoryEnv, create_buffers,
+                                  get_wandb_key)
 
 
 @pytest.mark.parametrize(
@@ -26,6 +29,42 @@ def test_atari_wrapper(resize_shape):
     assert state.shape == reset_state.shape == (*resize_shape, 1)
 
 
+def test_shared_memory_env():
+    """
+    Test states, rewards and dones from a SharedMemoryEnv match a
+    same-seeded environment stepped in the main process.
+    """
+    env = gym.make('CartPole-v1')
+    shared_env = SharedMemoryEnv(gym.make('CartPole-v1'))
+    env.seed(555)
+    shared_env.seed(555)
+    assert np.allclose(env.reset(), shared_env.reset())
+    for _ in range(10):
+        action = env.action_space.sample()
+        state, reward, done, _ = env.step(action)
+        shared_state, shared_reward, shared_done, _ = shared_env.step(action)
+        assert np.allclose(state, shared_state)
+        assert reward == shared_reward and done == shared_done
+        if done:
+            break
+    shared_env.close()
+    assert not shared_env.worker.is_alive()
+    shared_env.close()
+
+
+def test_shared_memory_env_garbage_collected():
+    """
+    Ensure the worker process of an unclosed SharedMemoryEnv is stopped
+    once the environment is garbage collected.
+    """
+    shared_env = SharedMemoryEnv(gym.make('CartPole-v1'))
+    worker = shared_env.worker
+    assert worker.is_alive()
+    del shared_env
+    gc.collect()
+    assert not worker.is_alive()
+
+
 def test_get_wandb_key(tmp_path):
     """
     Test wandb API key is fetched correctly.
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import xagents
 from xagents.base import OffPolicy
 from xagents.utils.cli import agent_args, non_agent_args, off_policy_args
@@ -13,12 +15,26 @@ def get_expected_flags(argv, as_kwargs=False):
         as_kwargs: If True example-flag1 will be returned as example_flag1
 
     Returns:
-        List of ['example-flag1', 'example-flag2', ...]
+        Tuple of ('example-flag1', 'example-flag2', ...)
         or
-        list of ['example_flag1', 'example_flag2']
+        tuple of ('example_flag1', 'example_flag2', ...)
+    """
+    return get_cached_expected_flags(tuple(argv), as_kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_cached_expected_flags(argv, as_kwargs=False):
+    """
+    Cached version of `get_expected_flags`.
+    Args:
+        argv: Arguments passed, as a tuple.
+        as_kwargs: If True example-flag1 will be returned as example_flag1
+
+    Returns:
+        Tuple of expected flags/keywords.
     """
     if not argv:
-        return []
+        return ()
     command = argv[0]
     expected_kwargs = {}
     expected_kwargs.update(agent_args)
@@ -30,8 +46,8 @@ def get_expected_flags(argv, as_kwargs=False):
         if issubclass(agent_data['agent'], OffPolicy) or argv[1] == 'acer':
             expected_kwargs.update(off_policy_args)
     if not as_kwargs:
-        return expected_kwargs.keys()
-    return [flag.replace('-', '_') for flag in expected_kwargs.keys()]
+        return tuple(expected_kwargs)
+    return tuple(flag.replace('-', '_') for flag in expected_kwargs)
 
 
 def assert_flags_displayed(cap, title, cli_args):
@@ -1,7 +1,7 @@
 import numpy as np
 import tensorflow as tf
 
-from xagents import PPO
+from xagents.ppo.agent import PPO
 
 
 class TRPO(PPO):
@@ -306,9 +306,7 @@ class TRPO(PPO):
         Returns:
             None
         """
-        states, actions, returns, values, _ = tf.numpy_function(
-            self.get_batch, [], 5 * [tf.float32]
-        )
+        states, actions, returns, values, _ = self.get_training_batch()
         advantages = returns - values
         advantages = (advantages - tf.reduce_mean(advantages)) / tf.math.reduce_std(
             advantages
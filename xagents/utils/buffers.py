@@ -2,6 +2,7 @@ import random
 from collections import deque
 
 import numpy as np
+import tensorflow as tf
 
 
 class BaseBuffer:
@@ -146,3 +147,83 @@ class ReplayBuffer2(BaseBuffer):
             0, min(self.current_size, self.size), self.batch_size
         )
         return [slot[indices] for slot in self.slots]
+
+
+class ReplayBuffer3(BaseBuffer):
+    """
+    tf.Variable-based circular replay buffer shared by multiple environments.
+    Each append() stores 1 entry per environment for every slot at the same
+    position, therefore it can be written and sampled inside tf.function
+    without host copies. Unlike the other buffers, the full buffer memory
+    (n_envs x size entries per slot) is allocated at once by the first append().
+    """
+
+    def __init__(self, size, n_envs, shapes, dtypes, device='/CPU:0', **kwargs):
+        """
+        Initialize replay buffer.
+        Args:
+            size: Buffer maximum size per environment.
+            n_envs: Number of environments sharing the buffer.
+            shapes: A list of 1 entry shapes per slot, excluding the environment
+                dimension.
+            dtypes: A list of dtypes per slot.
+            device: Device on which the buffer variables are placed.
+            **kwargs: kwargs passed to BaseBuffer.
+        """
+        super(ReplayBuffer3, self).__init__(size, **kwargs)
+        self.n_envs = n_envs
+        self.shapes = shapes
+        self.dtypes = dtypes
+        self.device = device
+        self.slots = []
+        with tf.device(device):
+            self.current_size = tf.Variable(0, trainable=False)
+            self.append_count = tf.Variable(0, trainable=False)
+
+    def create_slots(self):
+        """
+        Allocate slot variables, which are created outside any tf.function
+        being traced, so the first append() can be called from one.
+
+        Returns:
+            None
+        """
+        with tf.init_scope(), tf.device(self.device):
+            self.slots = [
+                tf.Variable(
+                    tf.zeros((self.n_envs, self.size, *shape), dtype),
+                    trainable=False,
+                )
+                for (shape, dtype) in zip(self.shapes, self.dtypes)
+            ]
+
+    def append(self, *args):
+        """
+        Add 1 entry per environment to each slot.
+        Args:
+            *args: Items to store, each having n_envs * prod(respective shape) values,
+                which are cast to the respective slot dtype.
+
+        Returns:
+            None
+        """
+        if not self.slots:
+            self.create_slots()
+        position = self.append_count % self.size
+        for slot, shape, arg in zip(self.slots, self.shapes, args):
+            slot[:, position].assign(
+                tf.cast(tf.reshape(arg, (self.n_envs, *shape)), slot.dtype)
+            )
+        self.append_count.assign_add(1)
+        self.current_size.assign(tf.minimum(self.append_count, self.size))
+
+    def get_sample(self):
+        """
+        Sample 1 stored entry per environment.
+
+        Returns:
+            Same number of args passed to append, having self.n_envs as
+            first shape.
+        """
+        indices = tf.random.uniform((self.n_envs,), 0, self.current_size, tf.int32)
+        return [tf.gather(slot, indices, axis=1, batch_dims=1) for slot in self.slots]
@@ -44,6 +44,11 @@ non_agent_args = {
         'action': 'store_true',
         'hp_type': 'categorical',
     },
+    'shared-memory-envs': {
+        'help': 'If specified, environments will be stepped in parallel worker\n'
+        'processes that write states to shared memory',
+        'action': 'store_true',
+    },
 }
 
 off_policy_args = {
@@ -1,24 +1,30 @@
 import configparser
+import multiprocessing as mp
 import os
 import re
-from collections import deque
+import weakref
+from functools import lru_cache
 from pathlib import Path
 
-import cv2
 import gym
 import numpy as np
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 from gym.spaces import Box, Discrete
-from matplotlib import pyplot as plt
-from tensorflow.keras.initializers import GlorotUniform, Orthogonal
-from tensorflow.keras.layers import Conv2D, Dense, Flatten, Input
-from tensorflow.keras.models import Model
-from tensorflow.keras.optimizers import Adam
 
 import xagents
-from xagents.utils.buffers import ReplayBuffer1, ReplayBuffer2
+from xagents.utils.registry import allocate_by_network, register_models
+
+
+@lru_cache(maxsize=None)
+def get_cv2():
+    """
+    Import cv2 once, on first use, which keeps it out of the xagents import path.
+
+    Returns:
+        cv2 module.
+    """
+    import cv2
+
+    return cv2
 
 
 class LazyFrames:
@@ -91,7 +97,9 @@ class AtariWrapper(gym.Wrapper):
         self.frame_shape = resize_shape
         self.observation_space.shape = (*resize_shape, 1)
         self.max_frame = max_frame
-        self.frame_buffer = deque(maxlen=2)
+        self.previous_frame = self.current_frame = None
+        self.gray_frame = None
+        self.max_buffer = None
 
     def process_frame(self, frame):
         """
@@ -102,8 +110,9 @@ class AtariWrapper(gym.Wrapper):
         Returns:
             Processed frame.
         """
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        frame = cv2.resize(frame, self.frame_shape)
+        cv2 = get_cv2()
+        self.gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray_frame)
+        frame = cv2.resize(self.gray_frame, self.frame_shape)
         return LazyFrames(np.expand_dims(frame, -1))
 
     def step(self, action):
@@ -120,11 +129,16 @@ class AtariWrapper(gym.Wrapper):
         for _ in range(self.skips):
             state, reward, done, info = self.env.step(action)
             if self.max_frame:
-                self.frame_buffer.append(state)
-                state = np.max(np.stack(self.frame_buffer), axis=0)
+                self.previous_frame, self.current_frame = self.current_frame, state
             total_reward += reward
             if done:
                 break
+        if self.max_frame:
+            if self.max_buffer is None:
+                self.max_buffer = np.empty_like(state)
+            state = np.maximum(
+                self.previous_frame, self.current_frame, out=self.max_buffer
+            )
         return self.process_frame(state), total_reward, done, info
 
     def reset(self, **kwargs):
@@ -138,12 +152,185 @@ class AtariWrapper(gym.Wrapper):
         """
         state = self.env.reset(**kwargs)
         if self.max_frame:
-            self.frame_buffer.clear()
-            self.frame_buffer.append(state)
+            self.previous_frame = self.current_frame = state
         return self.process_frame(state)
 
 
-def create_envs(env_name, n=1, preprocess=True, *args, **kwargs):
+def run_env_worker(env, connection, observation_buffer):
+    """
+    Execute commands received from a SharedMemoryEnv in a worker process,
+    and write resulting observations to shared memory.
+    Args:
+        env: gym environment.
+        connection: multiprocessing.connection.Connection
+        observation_buffer: multiprocessing.RawArray that has the size
+            of 1 observation.
+
+    Returns:
+        None
+    """
+    observation = np.frombuffer(
+        observation_buffer, env.observation_space.dtype
+    ).reshape(env.observation_space.shape)
+    while True:
+        command, args, kwargs = connection.recv()
+        if command == 'close':
+            env.close()
+            connection.close()
+            break
+        result = getattr(env, command)(*args, **kwargs)
+        if command == 'step':
+            state, *result = result
+            observation[:] = state
+        elif command == 'reset':
+            observation[:] = result
+            result = None
+        connection.send(result)
+
+
+def stop_env_worker(connection, worker):
+    """
+    Stop a SharedMemoryEnv worker process and close its connection.
+    Args:
+        connection: multiprocessing.connection.Connection
+        worker: multiprocessing.Process running run_env_worker()
+
+    Returns:
+        None
+    """
+    if worker.is_alive():
+        connection.send(('close', (), {}))
+        worker.join()
+    connection.close()
+
+
+class SharedMemoryEnv(gym.Wrapper):
+    """
+    gym wrapper that steps the wrapped environment in a worker process.
+    Observations are written by the worker to shared memory, therefore
+    frames are not pickled, and only actions, rewards and dones are
+    sent through a pipe.
+    """
+
+    def __init__(self, env):
+        """
+        Start worker process.
+        Args:
+            env: gym environment.
+        """
+        super(SharedMemoryEnv, self).__init__(env)
+        shape, dtype = env.observation_space.shape, env.observation_space.dtype
+        observation_buffer = mp.RawArray(
+            'B', int(np.prod(shape)) * np.dtype(dtype).itemsize
+        )
+        self.observation = np.frombuffer(observation_buffer, dtype).reshape(shape)
+        self.connection, worker_connection = mp.Pipe()
+        self.worker = mp.Process(
+            target=run_env_worker,
+            args=(env, worker_connection, observation_buffer),
+            daemon=True,
+        )
+        self.worker.start()
+        worker_connection.close()
+        self.finalizer = weakref.finalize(
+            self, stop_env_worker, self.connection, self.worker
+        )
+
+    def call(self, command, *args, **kwargs):
+        """
+        Call a method of the wrapped environment in the worker process.
+        Args:
+            command: Method name.
+            *args: args passed to the method.
+            **kwargs: kwargs passed to the method.
+
+        Returns:
+            Method result.
+        """
+        self.connection.send((command, args, kwargs))
+        return self.connection.recv()
+
+    def step_async(self, action):
+        """
+        Send action to the worker process without waiting for the result.
+        Args:
+            action: Action supported by self.env
+
+        Returns:
+            None
+        """
+        self.connection.send(('step', (action,), {}))
+
+    def step_wait(self):
+        """
+        Wait for the step sent by self.step_async()
+
+        Returns:
+            (state, reward, done, info)
+        """
+        reward, done, info = self.connection.recv()
+        return self.observation.copy(), reward, done, info
+
+    def step(self, action):
+        """
+        Step the wrapped environment.
+        Args:
+            action: Action supported by self.env
+
+        Returns:
+            (state, reward, done, info)
+        """
+        self.step_async(action)
+        return self.step_wait()
+
+    def reset(self, **kwargs):
+        """
+        Reset the wrapped environment.
+        Args:
+            **kwargs: kwargs passed to self.env.reset()
+
+        Returns:
+            Initial state.
+        """
+        self.call('reset', **kwargs)
+        return self.observation.copy()
+
+    def seed(self, seed=None):
+        """
+        Seed the wrapped environment.
+        Args:
+            seed: int, random seed.
+
+        Returns:
+            Seeds used by the wrapped environment.
+        """
+        return self.call('seed', seed)
+
+    def render(self, mode='human', **kwargs):
+        """
+        Render the wrapped environment.
+        Args:
+            mode: Render mode passed to self.env.render()
+            **kwargs: kwargs passed to self.env.render()
+
+        Returns:
+            Render result.
+        """
+        return self.call('render', mode, **kwargs)
+
+    def close(self):
+        """
+        Close the wrapped environment and stop the worker process. The
+        worker is also stopped if the environment is garbage collected
+        or the interpreter exits without closing it.
+
+        Returns:
+            None
+        """
+        self.finalizer()
+
+
+def create_envs(env_name, n=1, preprocess=True, *args, shared_memory=False, **kwargs):
     """
     Create gym environment and initialize preprocessing settings.
     Args:
@@ -151,6 +338,8 @@ def create_envs(env_name, n=1, preprocess=True, *args, **kwargs):
         n: Number of environments to create.
         preprocess: If True, AtariWrapper will be used.
         *args: args to be passed to AtariWrapper
+        shared_memory: If True, each environment is wrapped by SharedMemoryEnv
+            and stepped in a separate process.
         **kwargs: kwargs to be passed to AtariWrapper
 
     Returns:
@@ -164,6 +353,8 @@ def create_envs(env_name, n=1, preprocess=True, *args, **kwargs):
             f'shape {envs[0].observation_space.shape}'
         )
         envs = [AtariWrapper(env, *args, **kwargs) for env in envs]
+    if shared_memory:
+        envs = [SharedMemoryEnv(env) for env in envs]
     return envs
 
 
@@ -185,11 +376,16 @@ class ModelReader:
                 model will be compiled.
             seed: Random seed used by layer initializers.
         """
+        from tensorflow.keras.initializers import GlorotUniform, Orthogonal
+
         self.initializers = {'orthogonal': Orthogonal, 'glorot_uniform': GlorotUniform}
         self.cfg_file = cfg_file
         with open(cfg_file) as cfg:
             self.parser = configparser.ConfigParser()
             self.parser.read_file(cfg)
+        self.sections = [
+            (name, dict(self.parser[name])) for name in self.parser.sections()
+        ]
         self.optimizer = optimizer
         self.output_units = output_units
         self.input_shape = input_shape
@@ -200,13 +396,13 @@ class ModelReader:
         """
         Get layer initializer if specified in the configuration.
         Args:
-            section: str, representing section unique name.
+            section: A dictionary of section options.
 
         Returns:
             tf.keras.initializers.Initializer
         """
-        initializer_name = self.parser[section].get('initializer')
-        gain = self.parser[section].get('gain')
+        initializer_name = section.get('initializer')
+        gain = section.get('gain')
         if self.seed is not None:
             initializer_name = initializer_name or 'glorot_uniform'
         initializer_kwargs = {'seed': self.seed}
@@ -220,15 +416,17 @@ class ModelReader:
         """
         Parse convolution layer parameters and create layer.
         Args:
-            section: str, representing section unique name.
+            section: A dictionary of section options.
 
         Returns:
             tf.keras.layers.Conv2D
         """
-        filters = int(self.parser[section]['filters'])
-        kernel_size = int(self.parser[section]['size'])
-        stride = int(self.parser[section]['stride'])
-        activation = self.parser[section].get('activation')
+        from tensorflow.keras.layers import Conv2D
+
+        filters = int(section['filters'])
+        kernel_size = int(section['size'])
+        stride = int(section['stride'])
+        activation = section.get('activation')
         return Conv2D(
             filters,
             kernel_size,
@@ -241,19 +439,21 @@ class ModelReader:
         """
         Parse dense layer parameters and create layer.
         Args:
-            section: str, representing section unique name.
+            section: A dictionary of section options.
 
         Returns:
             tf.keras.layers.Dense
         """
-        units = self.parser[section].get('units')
+        from tensorflow.keras.layers import Dense
+
+        units = section.get('units')
         if not units:
             assert (
                 len(self.output_units) > self.output_count
             ), 'Output units given are less than dense layers required'
             units = self.output_units[self.output_count]
             self.output_count += 1
-        activation = self.parser[section].get('activation')
+        activation = section.get('activation')
         return Dense(
             units, activation, kernel_initializer=self.get_initializer(section)
         )
@@ -266,23 +466,25 @@ class ModelReader:
         Returns:
             tf.keras.Model
         """
+        from tensorflow.keras.layers import Flatten, Input
+        from tensorflow.keras.models import Model
+
         outputs = []
         common_layer = None
         input_layer = current_layer = Input(self.input_shape)
-        sections = self.parser.sections()
-        assert sections, f'Empty model configuration {self.cfg_file}'
-        for section in self.parser.sections():
-            if section.startswith('convolutional'):
+        assert self.sections, f'Empty model configuration {self.cfg_file}'
+        for name, section in self.sections:
+            if name.startswith('convolutional'):
                 current_layer = self.create_convolution(section)(current_layer)
-            if section.startswith('flatten'):
+            if name.startswith('flatten'):
                 current_layer = Flatten()(current_layer)
-            if section.startswith('dense'):
+            if name.startswith('dense'):
                 current_layer = self.create_dense(section)(
                     common_layer if common_layer is not None else current_layer
                 )
-            if self.parser[section].get('common'):
+            if section.get('common'):
                 common_layer = current_layer
-            if self.parser[section].get('output'):
+            if section.get('output'):
                 outputs.append(current_layer)
         self.output_count = 0
         model = Model(input_layer, outputs)
@@ -291,55 +493,6 @@ class ModelReader:
         return model
 
 
-def allocate_by_network(available_cfg, cfg_group):
-    """
-    Allocate given cfg file path into given group's `cnn` or `ann`
-    Args:
-        available_cfg: Path to .cfg file in `models` configuration folder.
-        cfg_group: A dictionary with `cnn` and `ann` as keys.
-
-    Returns:
-        None
-    """
-    if 'cnn' in available_cfg:
-        cfg_group['cnn'].append(available_cfg)
-    if 'ann' in available_cfg:
-        cfg_group['ann'].append(available_cfg)
-
-
-def register_models(agents):
-    """
-    Register default model configuration files found in all agent `models`
-    configuration folders to be added to xagents.agents.
-    Args:
-        agents: xagents.agents
-
-    Returns:
-        None
-    """
-    for agent_data in agents.values():
-        models_folder = Path(agent_data['module'].__file__).parent / 'models'
-        available_cfgs = [model_cfg.as_posix() for model_cfg in models_folder.iterdir()]
-        actor_cfgs = {'cnn': [], 'ann': []}
-        critic_cfgs = {'cnn': [], 'ann': []}
-        model_cfgs = {'cnn': [], 'ann': []}
-        for available_cfg in available_cfgs:
-            if 'actor' not in available_cfg and 'critic' not in available_cfg:
-                allocate_by_network(available_cfg, model_cfgs)
-            elif 'actor' in available_cfg and 'critic' in available_cfg:
-                allocate_by_network(available_cfg, model_cfgs)
-            elif 'actor' in available_cfg:
-                allocate_by_network(available_cfg, actor_cfgs)
-            elif 'critic' in available_cfg:
-                allocate_by_network(available_cfg, critic_cfgs)
-        for key, val in zip(
-            ['actor_model', 'critic_model', 'model'],
-            [actor_cfgs, critic_cfgs, model_cfgs],
-        ):
-            if any(val.values()):
-                agent_data[key] = val
-
-
 def get_wandb_key(configuration_file=None):
     """
     Check ~/.netrc and WANDB_API_KEY environment variable for wandb api key.
@@ -388,6 +541,9 @@ def plot_history(
     Returns:
         None
     """
+    import pandas as pd
+    from matplotlib import pyplot as plt
+
     time_divisors = {'hour': 3600, 'minute': 60, 'second': 1}
     assert len(paths) == len(agents), (
         f'Expected `paths` and `agents` to have the same sizes, '
@@ -424,6 +580,9 @@ def write_from_dict(_dict, path):
     Returns:
         None
     """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
     table = pa.Table.from_pydict(_dict)
     pq.write_to_dataset(table, root_path=path, compression='gzip')
 
@@ -445,6 +604,8 @@ def create_model(
     Returns:
         tf.keras.Model
     """
+    from tensorflow.keras.optimizers import Adam
+
     units = [
         env.action_space.n
         if isinstance(env.action_space, Discrete)
@@ -537,6 +698,8 @@ def create_buffers(
     Returns:
         list of buffers.
     """
+    from xagents.utils.buffers import ReplayBuffer1, ReplayBuffer2
+
     initial_size = initial_size or max_size
     if as_total:
         max_size //= n_envs
@@ -585,6 +748,7 @@ def create_agent(agent_id, agent_kwargs, non_agent_kwargs, trial=None):
         non_agent_kwargs['n_envs'],
         non_agent_kwargs['preprocess'],
         max_frame=non_agent_kwargs['max_frame'],
+        shared_memory=non_agent_kwargs['shared_memory_envs'],
     )
     agent_kwargs['envs'] = envs
     optimizer_kwargs = {
@@ -601,10 +765,7 @@ def create_agent(agent_id, agent_kwargs, non_agent_kwargs, trial=None):
         seed=agent_kwargs['seed'],
     )
     agent_kwargs.update(models)
-    if (
-        issubclass(xagents.agents[agent_id]['agent'], xagents.OffPolicy)
-        or agent_id == 'acer'
-    ):
+    if agent_id in xagents.off_policy_agents:
         buffers = create_buffers(
             agent_id,
             non_agent_kwargs['buffer_max_size'],
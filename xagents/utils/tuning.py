@@ -82,7 +82,11 @@ class Objective:
         agent = create_agent(
             self.agent_id, vars(self.agent_args), vars(self.non_agent_args), trial
         )
-        agent.fit(max_steps=self.command_args.trial_steps)
+        try:
+            agent.fit(max_steps=self.command_args.trial_steps)
+        finally:
+            for env in agent.envs:
+                env.close()
         trial_reward = np.around(np.mean(agent.total_rewards or [0]), 2)
         return trial_reward
 